@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from pathlib import Path
+from functools import lru_cache
 from typing import Any, Dict, Optional
 from uuid import uuid4
 import hashlib
@@ -10,33 +12,38 @@ import json
 import os
 
 import boto3
+import botocore.session
+from botocore.config import Config
+import orjson
+from botocore.credentials import RefreshableCredentials
 from botocore.exceptions import BotoCoreError, ClientError
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session
 
+from app.jsonutil import loads_exact
 from app.models import Event, ImportJob
 
 EVIDENCE_DIR = Path(__file__).resolve().parents[2] / "evidence"
 EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
 
+# LookupEvents allows about 2 calls per second per account and region, so the
+# fan-out matches that and adaptive retries pace whatever still gets throttled.
+LOOKUP_WORKERS = 2
+_CLOUDTRAIL_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 10})
+
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _json_safe(value: Any) -> Any:
+def _json_default(value: Any) -> Any:
     """
-    Recursively convert Python objects into JSON-serializable types.
-    This is required because CloudTrail lookup results contain datetime objects (ex: EventTime).
+    orjson ``default`` hook for types it does not serialize natively.
+    CloudTrail lookup results carry datetimes (ex: EventTime), which orjson
+    already handles; this covers the rest without a recursive pre-walk.
     """
-    if value is None:
-        return None
-
-    if isinstance(value, (str, int, float, bool)):
-        return value
-
-    if isinstance(value, (datetime, date)):
-        return value.isoformat()
-
     if isinstance(value, Decimal):
         # safer than float in many cases, but float is also acceptable for this project
         return float(value)
@@ -45,38 +52,63 @@ def _json_safe(value: Any) -> Any:
         # CloudTrail data is generally UTF-8 safe, but protect against decode errors
         return value.decode("utf-8", errors="replace")
 
-    if isinstance(value, dict):
-        # JSON requires string keys
-        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
 
-    if isinstance(value, (list, tuple, set)):
-        return [_json_safe(v) for v in value]
+    if isinstance(value, datetime):
+        # only reached on the json.dumps fallback; keeps orjson's format
+        return value.isoformat()
 
     # fallback, ensure we do not crash serialization
     return str(value)
 
 
+def _dumps(value: Any) -> bytes:
+    try:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # orjson cannot encode ints past 64 bits; loads_exact keeps them as ints.
+        return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 def _assume_role_if_configured(base: boto3.Session, role_arn: str, region: str) -> boto3.Session:
+    """
+    Returns a session whose assumed-role credentials refresh themselves
+    before they expire, so it can be kept around between syncs.
+    """
     sts = base.client("sts", region_name=region)
-    resp = sts.assume_role(
-        RoleArn=role_arn,
-        RoleSessionName="secureops-workbench-cloudtrail-sync",
-        DurationSeconds=3600,
-    )
-    creds = resp["Credentials"]
-    return boto3.Session(
-        aws_access_key_id=creds["AccessKeyId"],
-        aws_secret_access_key=creds["SecretAccessKey"],
-        aws_session_token=creds["SessionToken"],
-        region_name=region,
-    )
 
+    def _refresh() -> Dict[str, str]:
+        resp = sts.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName="secureops-workbench-cloudtrail-sync",
+            DurationSeconds=3600,
+        )
+        creds = resp["Credentials"]
+        return {
+            "access_key": creds["AccessKeyId"],
+            "secret_key": creds["SecretAccessKey"],
+            "token": creds["SessionToken"],
+            "expiry_time": creds["Expiration"].isoformat(),
+        }
+
+    credentials = RefreshableCredentials.create_from_metadata(
+        metadata=_refresh(),
+        refresh_using=_refresh,
+        method="sts-assume-role",
+    )
+    core = botocore.session.get_session()
+    core._credentials = credentials
+    core.set_config_variable("region", region)
+    return boto3.Session(botocore_session=core)
 
-def sync_cloudtrail(session: Session, minutes: int = 15, region: Optional[str] = None) -> Dict[str, Any]:
-    region = region or os.getenv("AWS_REGION") or "us-east-1"
-    role_arn = os.getenv("AWS_ROLE_ARN")
-    aws_profile = os.getenv("AWS_PROFILE")
 
+@lru_cache(maxsize=8)
+def _get_cloudtrail_client(aws_profile: Optional[str], role_arn: Optional[str], region: str) -> Any:
+    """
+    CloudTrail client per (profile, role, region), reused across syncs.
+    boto3 clients are thread-safe, so sharing one between requests is fine.
+    """
     # boto3 default credential chain:
     # - env vars, shared config/profile (incl SSO), then instance role
     base = boto3.Session(profile_name=aws_profile, region_name=region)
@@ -87,37 +119,110 @@ def sync_cloudtrail(session: Session, minutes: int = 15, region: Optional[str] =
         except (ClientError, BotoCoreError) as e:
             raise RuntimeError(f"assume_role failed: {e}") from e
 
-    client = base.client("cloudtrail", region_name=region)
+    return base.client("cloudtrail", region_name=region, config=_CLOUDTRAIL_CONFIG)
+
+
+def _lookup_range(client: Any, start: datetime, end: datetime) -> list[dict[str, Any]]:
+    events: list[dict[str, Any]] = []
+    paginator = client.get_paginator("lookup_events")
+    for page in paginator.paginate(StartTime=start, EndTime=end, PaginationConfig={"PageSize": 50}):
+        events.extend(page.get("Events", []))
+    return events
+
+
+def _lookup_events(client: Any, start: datetime, end: datetime, minutes: int) -> list[dict[str, Any]]:
+    """
+    Splits [start, end] into sub-ranges and pages through them concurrently,
+    since each sub-range has its own NextToken chain. Results stay newest
+    first, like a single lookup.
+    """
+    parts = max(1, min(LOOKUP_WORKERS, minutes))
+    if parts == 1:
+        return _lookup_range(client, start, end)
+
+    # Newest sub-range first; the last one is pinned to `start` to avoid rounding gaps.
+    step = (end - start) / parts
+    bounds = [end - step * i for i in range(parts)] + [start]
+    with ThreadPoolExecutor(max_workers=parts) as pool:
+        chunks = list(pool.map(lambda i: _lookup_range(client, bounds[i + 1], bounds[i]), range(parts)))
+
+    # Range bounds are inclusive, so an event on a boundary can come back twice.
+    seen: set[str] = set()
+    events: list[dict[str, Any]] = []
+    for chunk in chunks:
+        for ev in chunk:
+            event_id = ev.get("EventId")
+            if event_id:
+                if event_id in seen:
+                    continue
+                seen.add(event_id)
+            events.append(ev)
+    return events
+
+
+def _insert_new_events(session: Session, rows: list[dict[str, Any]]) -> int:
+    """
+    Bulk insert that skips events already stored under the same CloudTrail
+    eventID, so overlapping sync windows do not duplicate. Returns the number
+    of rows actually inserted.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(Event).on_conflict_do_nothing(index_elements=["cloudtrail_event_id"])
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(Event).on_conflict_do_nothing(index_elements=["cloudtrail_event_id"])
+    else:
+        stmt = insert(Event)
+    return len(session.execute(stmt.returning(Event.id), rows).all())
+
+
+def sync_cloudtrail(session: Session, minutes: int = 15, region: Optional[str] = None) -> Dict[str, Any]:
+    region = region or os.getenv("AWS_REGION") or "us-east-1"
+    role_arn = os.getenv("AWS_ROLE_ARN")
+    aws_profile = os.getenv("AWS_PROFILE")
+
+    client = _get_cloudtrail_client(aws_profile, role_arn, region)
 
     end_time = _utc_now()
     start_time = end_time - timedelta(minutes=minutes)
 
-    events_raw: list[dict[str, Any]] = []
     try:
-        paginator = client.get_paginator("lookup_events")
-        for page in paginator.paginate(StartTime=start_time, EndTime=end_time, PaginationConfig={"PageSize": 50}):
-            for ev in page.get("Events", []):
-                cloudtrail_event_str = ev.get("CloudTrailEvent")
-                parsed: dict[str, Any] = {}
+        lookup = _lookup_events(client, start_time, end_time, minutes)
+    except (ClientError, BotoCoreError) as e:
+        raise RuntimeError(f"cloudtrail lookup_events failed: {e}") from e
 
-                if isinstance(cloudtrail_event_str, str) and cloudtrail_event_str.strip():
-                    try:
-                        parsed = json.loads(cloudtrail_event_str)
-                    except Exception:
-                        parsed = {"raw_cloudtrail_event": cloudtrail_event_str}
+    # (serialized event, eventID, userName, eventSource) per CloudTrail record
+    records: list[tuple[bytes, Optional[str], Optional[str], Optional[str]]] = []
+    for ev in lookup:
+        cloudtrail_event_str = ev.get("CloudTrailEvent")
+        parsed: dict[str, Any] = {}
 
-                lookup_summary = {k: v for k, v in ev.items() if k != "CloudTrailEvent"}
+        if isinstance(cloudtrail_event_str, str) and cloudtrail_event_str.strip():
+            try:
+                parsed = loads_exact(cloudtrail_event_str)
+            except Exception:
+                parsed = {"raw_cloudtrail_event": cloudtrail_event_str}
 
-                raw_obj = {
-                    "lookup": lookup_summary,
-                    "cloudtrail": parsed,
-                }
+        lookup_summary = {k: v for k, v in ev.items() if k != "CloudTrailEvent"}
 
-                # Critical: sanitize before storing or writing JSONL
-                events_raw.append(_json_safe(raw_obj))
+        raw_obj = {
+            "lookup": lookup_summary,
+            "cloudtrail": parsed,
+        }
 
-    except (ClientError, BotoCoreError) as e:
-        raise RuntimeError(f"cloudtrail lookup_events failed: {e}") from e
+        event_id = ev.get("EventId")
+        username = None
+        event_source = None
+        if isinstance(parsed, dict):
+            event_id = parsed.get("eventID") or event_id
+            ui = parsed.get("userIdentity", {})
+            if isinstance(ui, dict):
+                username = ui.get("userName")
+            event_source = parsed.get("eventSource")
+
+        # Critical: sanitize before storing or writing JSONL. Serialize
+        # once and reuse the bytes for both.
+        records.append((_dumps(raw_obj), event_id, username, event_source))
 
     # Store as evidence like a real ingestion job
     job_id = str(uuid4())
@@ -125,10 +230,42 @@ def sync_cloudtrail(session: Session, minutes: int = 15, region: Optional[str] =
     job_dir.mkdir(parents=True, exist_ok=True)
 
     filename = f"cloudtrail_{region}_{start_time.isoformat()}_{end_time.isoformat()}.jsonl".replace(":", "")
-    jsonl_bytes = b"".join((json.dumps(x, ensure_ascii=False).encode("utf-8") + b"\n") for x in events_raw)
-    sha = hashlib.sha256(jsonl_bytes).hexdigest()
-    (job_dir / filename).write_bytes(jsonl_bytes)
+    h = hashlib.sha256()
+    with (job_dir / filename).open("wb") as f:
+        for line, _, _, _ in records:
+            h.update(line)
+            h.update(b"\n")
+            f.write(line)
+            f.write(b"\n")
+    sha = h.hexdigest()
+
+    # Ingest Events as a single executemany. Bulk inserts bypass the model
+    # default_factory hooks, so ids and timestamps are filled in here; one
+    # clock read covers the whole sync.
+    received_at = _utc_now()
+    rows: list[dict[str, Any]] = []
+    for line, event_id, username, event_source in records:
+        payload = loads_exact(line)
+        payload["_meta"] = {
+            "region": region,
+            "eventSource": event_source,
+        }
+
+        rows.append(
+            {
+                "id": str(uuid4()),
+                "received_at": received_at,
+                "source": "aws-cloudtrail",
+                "host": None,
+                "user": username,
+                "raw": payload,
+                "cloudtrail_event_id": event_id,
+            }
+        )
 
+    ingested = _insert_new_events(session, rows) if rows else 0
+
+    # The evidence file keeps everything fetched; the job counts new events.
     job = ImportJob(
         id=job_id,
         filename=filename,
@@ -136,43 +273,9 @@ def sync_cloudtrail(session: Session, minutes: int = 15, region: Optional[str] =
         source="aws-cloudtrail",
         host=None,
         user=None,
-        events_ingested=len(events_raw),
+        events_ingested=ingested,
     )
     session.add(job)
-
-    # Ingest Events
-    ingested = 0
-    for obj in events_raw:
-        ct = obj.get("cloudtrail") if isinstance(obj, dict) else {}
-        username = None
-        event_source = None
-
-        if isinstance(ct, dict):
-            ui = ct.get("userIdentity", {})
-            if isinstance(ui, dict):
-                username = ui.get("userName")
-            event_source = ct.get("eventSource")
-
-        payload = _json_safe(
-            obj
-            | {
-                "_meta": {
-                    "region": region,
-                    "eventSource": event_source,
-                }
-            }
-        )
-
-        session.add(
-            Event(
-                source="aws-cloudtrail",
-                host=None,
-                user=username,
-                raw=payload,
-            )
-        )
-        ingested += 1
-
     session.commit()
 
     return {
@@ -1,14 +1,86 @@
+from typing import Optional
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, make_url
 from sqlmodel import SQLModel, create_engine, Session
 from .config import settings
 from . import models  # noqa: F401
 
-engine = create_engine(settings.database_url, echo=False)
+logger = logging.getLogger(__name__)
+
+
+def _engine_kwargs(database_url: str) -> dict:
+    url = make_url(database_url)
+    # Rows per multi-VALUES INSERT when an executemany is batched.
+    kwargs: dict = {"insertmanyvalues_page_size": 1000}
+    if url.get_backend_name() == "postgresql":
+        # Sized for FastAPI's worker threadpool; pre-ping drops dead connections.
+        kwargs.update(pool_size=20, max_overflow=40, pool_pre_ping=True)
+    if url.drivername == "postgresql+psycopg2":
+        # Let psycopg2's execute_batch handle executemany UPDATE/DELETE too.
+        kwargs["executemany_mode"] = "values_plus_batch"
+        kwargs["executemany_batch_page_size"] = 500
+    return kwargs
+
+
+engine = create_engine(settings.database_url, echo=False, **_engine_kwargs(settings.database_url))
+
+
+def _pg_column_type(conn: Connection, table: str, column: str) -> Optional[str]:
+    return conn.execute(
+        text("SELECT data_type FROM information_schema.columns WHERE table_name = :t AND column_name = :c"),
+        {"t": table, "c": column},
+    ).scalar()
+
+
+def _upgrade_schema(conn: Connection) -> None:
+    """
+    create_all only adds missing tables, so bring tables created by older
+    versions up to the current models. Every step is idempotent.
+    """
+    event_cols = {c["name"] for c in inspect(conn).get_columns("event")}
+    if "cloudtrail_event_id" not in event_cols:
+        conn.execute(text("ALTER TABLE event ADD COLUMN cloudtrail_event_id VARCHAR"))
+    conn.execute(
+        text("CREATE UNIQUE INDEX IF NOT EXISTS ix_event_cloudtrail_event_id ON event (cloudtrail_event_id)")
+    )
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_event_source_received ON event (source, received_at)"))
+
+    if conn.dialect.name == "postgresql":
+        # Postgres detections use jsonb functions on raw.
+        if _pg_column_type(conn, "event", "raw") == "json":
+            conn.execute(text("ALTER TABLE event ALTER COLUMN raw TYPE jsonb USING raw::jsonb"))
+        if _pg_column_type(conn, "incidentaction", "details") == "json":
+            conn.execute(text("ALTER TABLE incidentaction ALTER COLUMN details TYPE jsonb USING details::jsonb"))
+        # Created by earlier versions; nothing queries through it.
+        conn.execute(text("DROP INDEX IF EXISTS ix_event_raw_gin"))
+
+    insp = inspect(conn)
+    alert_uniques = {u["name"] for u in insp.get_unique_constraints("alert")}
+    alert_uniques.update(i["name"] for i in insp.get_indexes("alert") if i["unique"])
+    if "uq_alert_rule_event" not in alert_uniques:
+        duplicated = conn.execute(
+            text("SELECT 1 FROM alert GROUP BY rule_id, event_id HAVING COUNT(*) > 1 LIMIT 1")
+        ).first()
+        if duplicated:
+            # Leave existing alerts alone; new duplicates are still skipped
+            # by the NOT EXISTS checks in run_detections.
+            logger.warning("alert has duplicate (rule_id, event_id) rows; not adding uq_alert_rule_event")
+        elif conn.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE alert ADD CONSTRAINT uq_alert_rule_event UNIQUE (rule_id, event_id)"))
+        else:
+            conn.execute(text("CREATE UNIQUE INDEX uq_alert_rule_event ON alert (rule_id, event_id)"))
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        _upgrade_schema(conn)
 
 
 def get_session():
-    with Session(engine) as session:
+    # Every default is computed in Python, so committed objects are already
+    # complete; skip the reload SELECT that expiring them would trigger.
+    with Session(engine, expire_on_commit=False) as session:
         yield session
@@ -1,17 +1,26 @@
 import json
-from typing import Any, Optional
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    import ahocorasick
+except ImportError:  # optional, plain substring checks are used without it
+    ahocorasick = None
+
+from sqlalchemy import exists, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import Session, select
 
-from .models import Alert, Event, Rule
+from .models import Alert, Event, Rule, utc_now
 
 
-def _get_by_path(obj: Any, path: str) -> Optional[Any]:
+def _get_by_parts(obj: Any, parts: Tuple[str, ...]) -> Optional[Any]:
     """
-    Supports dot paths, ex: "event.action", against dict-like JSON.
+    Resolves a dot path, ex: "event.action" split into ("event", "action"),
+    against dict-like JSON.
     """
     cur = obj
-    for part in path.split("."):
+    for part in parts:
         if isinstance(cur, dict) and part in cur:
             cur = cur[part]
         else:
@@ -19,34 +28,173 @@ def _get_by_path(obj: Any, path: str) -> Optional[Any]:
     return cur
 
 
+class _FieldMatcher:
+    """
+    All rules that share one (match_source, match_field), compiled into a single
+    Aho-Corasick automaton so one pass over the field value finds every hit.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.parts = tuple(field.split("."))
+        self._needles: Dict[str, List[int]] = {}
+        self._automaton: Any = None
+
+    def add(self, needle: str, rule_index: int) -> None:
+        self._needles.setdefault(needle.lower(), []).append(rule_index)
+
+    def compile(self) -> None:
+        if ahocorasick is None:
+            return
+        automaton = ahocorasick.Automaton()
+        for needle, indexes in self._needles.items():
+            if needle:
+                automaton.add_word(needle, indexes)
+        if len(automaton):
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def matches(self, haystack: str) -> List[int]:
+        # An empty needle matches any present value, same as `"" in haystack`.
+        hits = list(self._needles.get("", ()))
+        if self._automaton is not None:
+            for _, indexes in self._automaton.iter(haystack):
+                hits.extend(indexes)
+        else:
+            for needle, indexes in self._needles.items():
+                if needle and needle in haystack:
+                    hits.extend(indexes)
+        return hits
+
+
+def _build_matchers(rules: List[Rule]) -> Dict[str, List[_FieldMatcher]]:
+    """
+    Buckets rules by source ("*" for any) and then by field.
+    """
+    by_key: Dict[tuple, _FieldMatcher] = {}
+    by_source: Dict[str, List[_FieldMatcher]] = {}
+    for i, r in enumerate(rules):
+        source = r.match_source if r.match_source and r.match_source != "*" else "*"
+        m = by_key.get((source, r.match_field))
+        if m is None:
+            m = by_key[(source, r.match_field)] = _FieldMatcher(r.match_field)
+            by_source.setdefault(source, []).append(m)
+        m.add(r.match_contains, i)
+    for m in by_key.values():
+        m.compile()
+    return by_source
+
+
+def _summary(r: Rule) -> str:
+    return f"{r.name}: {r.match_field} matched '{r.match_contains}'"
+
+
+def _run_detections_sql(session: Session, rules: List[Rule], limit: int) -> int:
+    """
+    Postgres path: one INSERT ... SELECT per rule, matching with jsonb operators.
+    Existing (rule_id, event_id) pairs are skipped by NOT EXISTS, with
+    ON CONFLICT DO NOTHING as a backstop for concurrent runs.
+    """
+    recent = (
+        select(Event.id, Event.source, Event.host, Event.user, Event.raw)
+        .order_by(Event.received_at.desc())
+        .limit(limit)
+        .subquery("recent")
+    )
+    now = utc_now()
+    created = 0
+
+    for r in rules:
+        value = func.jsonb_extract_path_text(recent.c.raw, *r.match_field.split("."))
+        candidates = (
+            select(
+                func.gen_random_uuid().cast(Alert.__table__.c.id.type),
+                literal(now, Alert.__table__.c.created_at.type),
+                literal(r.id),
+                literal(r.name),
+                literal(r.severity),
+                recent.c.id,
+                recent.c.source,
+                recent.c.host,
+                recent.c.user,
+                literal(_summary(r)),
+            )
+            .where(value.icontains(r.match_contains, autoescape=True))
+            .where(~exists().where(Alert.event_id == recent.c.id).where(Alert.rule_id == r.id))
+        )
+        if r.match_source and r.match_source != "*":
+            candidates = candidates.where(recent.c.source == r.match_source)
+
+        stmt = (
+            pg_insert(Alert.__table__)
+            .from_select(
+                ["id", "created_at", "rule_id", "rule_name", "severity", "event_id", "source", "host", "user", "summary"],
+                candidates,
+            )
+            .on_conflict_do_nothing()
+            # rowcount is only guaranteed for INSERT when asked for (psycopg3 drops it).
+            .execution_options(preserve_rowcount=True)
+        )
+        created += session.execute(stmt).rowcount
+
+    if created:
+        session.commit()
+
+    return created
+
+
 def run_detections(session: Session, limit: int = 500) -> int:
     rules = session.exec(select(Rule).order_by(Rule.created_at.desc())).all()
     if not rules:
         return 0
 
+    if session.get_bind().dialect.name == "postgresql":
+        return _run_detections_sql(session, rules, limit)
+
     events = session.exec(select(Event).order_by(Event.received_at.desc()).limit(limit)).all()
     created = 0
 
-    for ev in events:
-        for r in rules:
-            if r.match_source and r.match_source != "*" and r.match_source != ev.source:
-                continue
+    if not events:
+        return 0
 
-            value = _get_by_path(ev.raw, r.match_field)
-            if value is None:
-                continue
+    # One query for the alerts that already exist across this batch.
+    existing = {
+        (event_id, rule_id)
+        for event_id, rule_id in session.exec(
+            select(Alert.event_id, Alert.rule_id)
+            .where(Alert.event_id.in_([ev.id for ev in events]))
+            .where(Alert.rule_id.in_([r.id for r in rules]))
+        )
+    }
+
+    matchers = _build_matchers(rules)
+    any_source = matchers.get("*", [])
 
-            haystack = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
-            if r.match_contains.lower() not in haystack.lower():
+    for ev in events:
+        hits: set[int] = set()
+        # Lowercased field values for this event; None marks a missing field.
+        field_cache: Dict[str, Optional[str]] = {}
+        for m in chain(any_source, matchers.get(ev.source, ())):
+            if m.field in field_cache:
+                haystack = field_cache[m.field]
+            else:
+                value = _get_by_parts(ev.raw, m.parts)
+                if value is None:
+                    haystack = None
+                else:
+                    haystack = (value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)).lower()
+                field_cache[m.field] = haystack
+            if haystack is None:
                 continue
 
-            existing = session.exec(
-                select(Alert).where(Alert.event_id == ev.id).where(Alert.rule_id == r.id)
-            ).first()
-            if existing:
+            hits.update(m.matches(haystack))
+
+        # Fire in rule order so alert generation stays stable.
+        for i in sorted(hits):
+            r = rules[i]
+            if (ev.id, r.id) in existing:
                 continue
 
-            summary = f"{r.name}: {r.match_field} matched '{r.match_contains}'"
             session.add(
                 Alert(
                     rule_id=r.id,
@@ -56,7 +204,7 @@ def run_detections(session: Session, limit: int = 500) -> int:
                     source=ev.source,
                     host=ev.host,
                     user=ev.user,
-                    summary=summary,
+                    summary=_summary(r),
                 )
             )
             created += 1
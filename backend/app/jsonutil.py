@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Any, Union
+import json
+import re
+
+import orjson
+
+# orjson turns integers past 64 bits into floats; a long digit run sends the
+# text to the stdlib parser, which keeps them exact.
+_LONG_DIGITS = re.compile(r"\d{19}")
+_LONG_DIGITS_BYTES = re.compile(rb"\d{19}")
+
+
+def loads_exact(data: Union[bytes, str]) -> Any:
+    """
+    orjson for the common case, json.loads for what it cannot keep exact or
+    rejects (big ints, NaN/Infinity), so parsed values match the source text.
+    """
+    pattern = _LONG_DIGITS_BYTES if isinstance(data, bytes) else _LONG_DIGITS
+    if pattern.search(data) is None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
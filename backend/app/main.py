@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from tempfile import SpooledTemporaryFile
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
 from uuid import uuid4
 import hashlib
-import json
+import shutil
 
 from fastapi import Depends, FastAPI, File, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import delete, insert
 from sqlmodel import Session, select
 
 from app.auth import require_admin_api_key
@@ -18,6 +20,7 @@ from app.connectors.aws_cloudtrail import sync_cloudtrail
 
 from .db import get_session, init_db
 from .detect import run_detections
+from .jsonutil import loads_exact
 from .models import (
     Alert,
     EvidenceFile,
@@ -29,12 +32,14 @@ from .models import (
     Rule,
 )
 from .reporting import (
+    PDF_MAX_EVIDENCE,
     build_incident_packet,
     render_markdown,
     render_pdf,
     write_packet_evidence,
 )
 from .schemas import (
+    EventListItem,
     ImportJobRead,
     IncidentActionCreate,
     IncidentActionRead,
@@ -46,6 +51,15 @@ from .schemas import (
 EVIDENCE_DIR = Path(__file__).resolve().parents[1] / "evidence"
 EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Upload copy buffer size and rows per bulk INSERT for JSONL imports.
+IMPORT_COPY_CHUNK = 1 << 20
+IMPORT_BATCH_ROWS = 10_000
+# Uploads at least this large use Postgres COPY instead of batched INSERTs.
+IMPORT_PG_COPY_MIN_BYTES = 32 << 20
+# PDF reports spill to disk past this size; streamed back in chunks.
+PDF_SPOOL_MAX_BYTES = 8 << 20
+PDF_STREAM_CHUNK = 64 << 10
+
 app = FastAPI(title="SecureOps Workbench", version="0.3.0")
 
 
@@ -62,6 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Event, alert and packet payloads are repetitive JSON and compress well.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 @app.on_event("startup")
 def on_startup() -> None:
@@ -98,8 +115,24 @@ def list_alerts(
     limit: int = 100,
     session: Session = Depends(get_session),
     _admin: None = Depends(require_admin_api_key),
-) -> List[Alert]:
-    return session.exec(select(Alert).order_by(Alert.created_at.desc()).limit(limit)).all()
+) -> List[Dict[str, Any]]:
+    rows = session.exec(
+        select(
+            Alert.id,
+            Alert.created_at,
+            Alert.rule_id,
+            Alert.rule_name,
+            Alert.severity,
+            Alert.event_id,
+            Alert.source,
+            Alert.host,
+            Alert.user,
+            Alert.summary,
+        )
+        .order_by(Alert.created_at.desc())
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
 
 
 @app.delete("/alerts/{alert_id}")
@@ -113,9 +146,7 @@ def delete_alert(
         raise HTTPException(status_code=404, detail="alert not found")
 
     # remove incident links
-    links = session.exec(select(IncidentAlert).where(IncidentAlert.alert_id == alert_id)).all()
-    for x in links:
-        session.delete(x)
+    session.execute(delete(IncidentAlert).where(IncidentAlert.alert_id == alert_id))
 
     session.delete(a)
     session.commit()
@@ -125,8 +156,48 @@ def delete_alert(
 # -----------------------------
 # Imports (bulk ingestion)
 # -----------------------------
+def _iter_jsonl(path: Path) -> Iterator[Tuple[bytes, Any]]:
+    """
+    Yields (line, parsed) for each JSON line in the file, skipping blank and
+    unparseable lines.
+    """
+    with path.open("rb") as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                obj = loads_exact(line)
+            except Exception:
+                continue
+            yield line, obj
+
+
+def _copy_events(
+    session: Session,
+    path: Path,
+    source: str,
+    host: Optional[str],
+    user: Optional[str],
+    received_at: datetime,
+) -> int:
+    """
+    COPY fast path for large uploads (psycopg 3). Each validated line is sent
+    as-is for the jsonb column, so nothing is re-serialized. Runs inside the
+    session's transaction.
+    """
+    conn = session.connection().connection.driver_connection
+    ingested = 0
+    with conn.cursor() as cur:
+        with cur.copy('COPY event (id, received_at, source, host, "user", raw) FROM STDIN') as copy:
+            for line, _ in _iter_jsonl(path):
+                copy.write_row((str(uuid4()), received_at, source, host, user, line.decode("utf-8")))
+                ingested += 1
+    return ingested
+
+
 @app.post("/imports/jsonl", response_model=ImportJobRead)
-async def import_jsonl(
+def import_jsonl(
     file: UploadFile = File(...),
     source: str = Query(...),
     host: Optional[str] = Query(None),
@@ -134,26 +205,47 @@ async def import_jsonl(
     session: Session = Depends(get_session),
     _admin: None = Depends(require_admin_api_key),
 ) -> ImportJob:
-    data = await file.read()
-    sha = hashlib.sha256(data).hexdigest()
-
     job_id = str(uuid4())
     job_dir = EVIDENCE_DIR / "imports" / job_id
     job_dir.mkdir(parents=True, exist_ok=True)
 
     filename = file.filename or "upload.jsonl"
-    (job_dir / filename).write_bytes(data)
-
-    events: list[Event] = []
-    for raw_line in data.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
-        try:
-            obj = json.loads(line.decode("utf-8") if isinstance(line, (bytes, bytearray)) else line)
-        except Exception:
-            continue
-        events.append(Event(source=source, host=host, user=user, raw=obj))
+    target = job_dir / filename
+
+    # The upload is already spooled by Starlette; copy it to the evidence dir
+    # and hash the stored file, so it is never fully in memory.
+    with target.open("wb") as out:
+        shutil.copyfileobj(file.file, out, IMPORT_COPY_CHUNK)
+    with target.open("rb") as f:
+        sha = hashlib.file_digest(f, "sha256").hexdigest()
+
+    # Re-read line by line and insert in batches; bulk inserts skip
+    # default_factory, so ids and timestamps are set here. The whole upload
+    # was received at once, so its events share one timestamp.
+    received_at = utc_now()
+    ingested = 0
+    if session.get_bind().dialect.driver == "psycopg" and target.stat().st_size >= IMPORT_PG_COPY_MIN_BYTES:
+        ingested = _copy_events(session, target, source, host, user, received_at)
+    else:
+        rows: list[dict[str, Any]] = []
+        for _, obj in _iter_jsonl(target):
+            rows.append(
+                {
+                    "id": str(uuid4()),
+                    "received_at": received_at,
+                    "source": source,
+                    "host": host,
+                    "user": user,
+                    "raw": obj,
+                }
+            )
+            if len(rows) >= IMPORT_BATCH_ROWS:
+                session.execute(insert(Event), rows)
+                ingested += len(rows)
+                rows = []
+        if rows:
+            session.execute(insert(Event), rows)
+            ingested += len(rows)
 
     job = ImportJob(
         id=job_id,
@@ -162,14 +254,11 @@ async def import_jsonl(
         source=source,
         host=host,
         user=user,
-        events_ingested=len(events),
+        events_ingested=ingested,
     )
 
     session.add(job)
-    for ev in events:
-        session.add(ev)
     session.commit()
-    session.refresh(job)
 
     return job
 
@@ -179,8 +268,22 @@ def list_imports(
     limit: int = 50,
     session: Session = Depends(get_session),
     _admin: None = Depends(require_admin_api_key),
-) -> List[ImportJob]:
-    return session.exec(select(ImportJob).order_by(ImportJob.created_at.desc()).limit(limit)).all()
+) -> List[Dict[str, Any]]:
+    rows = session.exec(
+        select(
+            ImportJob.id,
+            ImportJob.filename,
+            ImportJob.sha256,
+            ImportJob.source,
+            ImportJob.host,
+            ImportJob.user,
+            ImportJob.events_ingested,
+            ImportJob.created_at,
+        )
+        .order_by(ImportJob.created_at.desc())
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
 
 
 @app.delete("/imports/{import_id}")
@@ -212,17 +315,22 @@ def ingest_event(
     ev = Event(source=source, host=host, user=user, raw=payload)
     session.add(ev)
     session.commit()
-    session.refresh(ev)
     return ev
 
 
-@app.get("/events", response_model=List[Event])
+# Listing leaves out raw, which can be large.
+@app.get("/events", response_model=List[EventListItem])
 def list_events(
     limit: int = 50,
     session: Session = Depends(get_session),
     _admin: None = Depends(require_admin_api_key),
-) -> List[Event]:
-    return session.exec(select(Event).order_by(Event.received_at.desc()).limit(limit)).all()
+) -> List[Dict[str, Any]]:
+    rows = session.exec(
+        select(Event.id, Event.received_at, Event.source, Event.host, Event.user)
+        .order_by(Event.received_at.desc())
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
 
 
 @app.post("/rules", response_model=Rule)
@@ -233,7 +341,6 @@ def create_rule(
 ) -> Rule:
     session.add(rule)
     session.commit()
-    session.refresh(rule)
     return rule
 
 
@@ -283,16 +390,19 @@ def create_incident(
         description=incident_in.description,
     )
     session.add(inc)
-    session.commit()
-    session.refresh(inc)
 
     if incident_in.alert_ids:
-        for alert_id in incident_in.alert_ids:
-            a = session.exec(select(Alert).where(Alert.id == alert_id)).first()
-            if not a:
-                continue
-            session.add(IncidentAlert(incident_id=inc.id, alert_id=a.id))
-        session.commit()
+        # Link only alerts that exist: one lookup, one batched insert.
+        requested = [str(alert_id) for alert_id in incident_in.alert_ids]
+        valid_ids = session.exec(select(Alert.id).where(Alert.id.in_(requested))).all()
+        if valid_ids:
+            now = utc_now()
+            session.execute(
+                insert(IncidentAlert),
+                [{"incident_id": inc.id, "alert_id": alert_id, "added_at": now} for alert_id in valid_ids],
+            )
+
+    session.commit()
 
     return inc
 
@@ -328,12 +438,8 @@ def delete_incident(
     if not inc:
         raise HTTPException(status_code=404, detail="incident not found")
 
-    links = session.exec(select(IncidentAlert).where(IncidentAlert.incident_id == incident_id)).all()
-    actions = session.exec(select(IncidentAction).where(IncidentAction.incident_id == incident_id)).all()
-    for x in links:
-        session.delete(x)
-    for x in actions:
-        session.delete(x)
+    session.execute(delete(IncidentAlert).where(IncidentAlert.incident_id == incident_id))
+    session.execute(delete(IncidentAction).where(IncidentAction.incident_id == incident_id))
 
     session.delete(inc)
     session.commit()
@@ -343,11 +449,12 @@ def delete_incident(
 @app.get("/incidents/{incident_id}/packet")
 def get_incident_packet(
     incident_id: str,
+    max_alerts: Optional[int] = Query(None, ge=1),
     session: Session = Depends(get_session),
     _admin: None = Depends(require_admin_api_key),
 ) -> Dict[str, Any]:
     try:
-        return build_incident_packet(session=session, incident_id=incident_id)
+        return build_incident_packet(session=session, incident_id=incident_id, max_alerts=max_alerts)
     except ValueError:
         raise HTTPException(status_code=404, detail="incident not found")
 
@@ -406,7 +513,6 @@ def create_incident_action(
     session.add(inc)
 
     session.commit()
-    session.refresh(action)
     return action
 
 
@@ -436,7 +542,6 @@ def close_incident(
     inc.updated_at = utc_now()
     session.add(inc)
     session.commit()
-    session.refresh(inc)
     return inc
 
 
@@ -463,6 +568,14 @@ def export_markdown(
     return Response(content=md, media_type="text/markdown")
 
 
+def _iter_file(f: BinaryIO) -> Iterator[bytes]:
+    try:
+        while chunk := f.read(PDF_STREAM_CHUNK):
+            yield chunk
+    finally:
+        f.close()
+
+
 @app.get("/incidents/{incident_id}/report/pdf")
 def export_pdf(
     incident_id: str,
@@ -470,11 +583,19 @@ def export_pdf(
     _admin: None = Depends(require_admin_api_key),
 ) -> StreamingResponse:
     packet = build_incident_packet(session=session, incident_id=incident_id)
-    evidence = write_packet_evidence(session=session, incident_id=incident_id, packet=packet)
-    pdf_bytes = render_pdf(packet=packet, evidence=evidence)
+    evidence = write_packet_evidence(session=session, incident_id=incident_id, packet=packet, limit=PDF_MAX_EVIDENCE)
+    # Render into a spooled temp file, which moves to disk once a large
+    # report outgrows memory, and stream it back from there.
+    out = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    try:
+        render_pdf(packet=packet, evidence=evidence, out=out)
+        out.seek(0)
+    except Exception:
+        out.close()
+        raise
 
     return StreamingResponse(
-        BytesIO(pdf_bytes),
+        _iter_file(out),
         media_type="application/pdf",
         headers={"Content-Disposition": 'attachment; filename="incident-report.pdf"'},
     )
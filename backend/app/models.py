@@ -2,7 +2,8 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel
 
 
@@ -10,6 +11,10 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+# JSON everywhere, JSONB on Postgres (stored parsed, queryable with jsonb operators).
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
 class ImportJob(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True, index=True)
     created_at: datetime = Field(default_factory=utc_now, index=True)
@@ -25,6 +30,10 @@ class ImportJob(SQLModel, table=True):
 
 
 class Event(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_event_source_received", "source", "received_at"),
+    )
+
     id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
     received_at: datetime = Field(default_factory=utc_now, index=True)
 
@@ -32,7 +41,11 @@ class Event(SQLModel, table=True):
     host: Optional[str] = Field(default=None, index=True)
     user: Optional[str] = Field(default=None, index=True)
 
-    raw: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+    # JSONB on Postgres so detections can match inside raw with jsonb operators.
+    raw: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType))
+
+    # Set for CloudTrail events; unique so re-syncing an overlapping window is a no-op.
+    cloudtrail_event_id: Optional[str] = Field(default=None, unique=True, index=True)
 
 
 class Rule(SQLModel, table=True):
@@ -50,6 +63,9 @@ class Rule(SQLModel, table=True):
 
 
 class Alert(SQLModel, table=True):
+    # Also serves as the composite index for the duplicate-alert lookup.
+    __table_args__ = (UniqueConstraint("rule_id", "event_id", name="uq_alert_rule_event"),)
+
     id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
     created_at: datetime = Field(default_factory=utc_now, index=True)
 
@@ -101,4 +117,4 @@ class IncidentAction(SQLModel, table=True):
     actor: Optional[str] = Field(default=None, index=True)
     action_type: str = Field(default="note", index=True)  # note, containment, eradication, recovery, comms
     summary: str
-    details: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    details: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONType))
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from datetime import datetime
-from io import BytesIO
+from io import BytesIO, StringIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from uuid import uuid4
 import hashlib
+import heapq
 import json
+import os
+import threading
 
+import orjson
 from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -27,6 +33,53 @@ from .models import (
 EVIDENCE_DIR = Path(__file__).resolve().parents[1] / "evidence"
 EVIDENCE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Raw event keys that may carry an IP (or a list of them), in report order.
+IP_KEYS = ("src_ip", "source_ip", "client_ip", "remote_ip", "ip", "src", "dst_ip", "dest_ip")
+
+
+class _LRUCache:
+    """
+    Small thread-safe LRU map; report endpoints run in the threadpool.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Event id -> (timeline summary, IPs). Events are never updated after ingest
+# and ids are not reused, so derived values can be kept across reports.
+_event_derived = _LRUCache(16384)
+
+
+def _dumps(value: Any, pretty: bool = False) -> bytes:
+    """
+    Pretty output matches json.dumps(indent=2, ensure_ascii=False, default=str);
+    compact output is for evidence packets, which tools read, not people.
+    """
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+    try:
+        return orjson.dumps(value, default=str, option=option)
+    except TypeError:
+        # orjson cannot encode ints past 64 bits, which action details may hold.
+        layout: Dict[str, Any] = {"indent": 2} if pretty else {"separators": (",", ":")}
+        return json.dumps(value, ensure_ascii=False, default=str, **layout).encode("utf-8")
+
 
 def _safe_iso(dt: Any) -> str:
     if isinstance(dt, datetime):
@@ -49,37 +102,61 @@ def _event_summary(raw: Dict[str, Any]) -> str:
 
 def _extract_ips(raw: Dict[str, Any]) -> List[str]:
     ips: List[str] = []
-    keys = ("src_ip", "source_ip", "client_ip", "remote_ip", "ip", "src", "dst_ip", "dest_ip")
-    for k in keys:
+    for k in IP_KEYS:
         v = raw.get(k)
-        if isinstance(v, str) and v.strip():
-            ips.append(v.strip())
-        elif isinstance(v, list):
-            for item in v:
-                if isinstance(item, str) and item.strip():
-                    ips.append(item.strip())
-    # De-dupe while preserving order
-    seen = set()
-    out: List[str] = []
-    for ip in ips:
-        if ip in seen:
+        if v is None:
             continue
-        seen.add(ip)
-        out.append(ip)
-    return out
+        items = (v,) if isinstance(v, str) else v if isinstance(v, list) else ()
+        ips.extend(s for s in (item.strip() for item in items if isinstance(item, str)) if s)
+    # De-dupe while preserving order
+    return list(dict.fromkeys(ips))
+
+
+def _uniq(items: List[str]) -> List[str]:
+    # Drops empties and duplicates, keeping first-seen order.
+    return list(dict.fromkeys(filter(None, items)))
 
 
-def build_incident_packet(session: Session, incident_id: str) -> Dict[str, Any]:
+def build_incident_packet(session: Session, incident_id: str, max_alerts: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Builds the incident packet. `max_alerts` keeps only the earliest alerts
+    (applied in SQL), so scope and timeline then cover that subset; reports
+    and evidence always use the full packet.
+    """
     inc = session.exec(select(Incident).where(Incident.id == incident_id)).first()
     if not inc:
         raise ValueError("incident not found")
 
-    alerts = session.exec(
-        select(Alert)
+    # Alerts and their events (if still present) in one round-trip, reading
+    # only the columns the packet uses. Event columns are NULL when the
+    # alert's event is gone.
+    stmt = (
+        select(
+            Alert.id,
+            Alert.created_at,
+            Alert.severity,
+            Alert.rule_name,
+            Alert.summary,
+            Alert.event_id,
+            Alert.host,
+            Alert.user,
+            Alert.source,
+            Event.id.label("ev_id"),
+            Event.received_at.label("ev_received_at"),
+            Event.source.label("ev_source"),
+            Event.host.label("ev_host"),
+            Event.user.label("ev_user"),
+            Event.raw.label("ev_raw"),
+        )
+        .select_from(Alert)
         .join(IncidentAlert, IncidentAlert.alert_id == Alert.id)
+        .outerjoin(Event, Event.id == Alert.event_id)
         .where(IncidentAlert.incident_id == incident_id)
         .order_by(Alert.created_at.asc())
-    ).all()
+    )
+    if max_alerts is not None:
+        stmt = stmt.limit(max_alerts)
+    rows = session.exec(stmt).all()
 
     actions = session.exec(
         select(IncidentAction)
@@ -87,40 +164,96 @@ def build_incident_packet(session: Session, incident_id: str) -> Dict[str, Any]:
         .order_by(IncidentAction.created_at.asc())
     ).all()
 
-    # Batch fetch related events for alert timeline enrichment
-    event_ids = [a.event_id for a in alerts if a.event_id]
-    events_by_id: Dict[str, Event] = {}
-    if event_ids:
-        evs = session.exec(select(Event).where(Event.id.in_(event_ids))).all()
-        events_by_id = {e.id: e for e in evs}
-
-    # Scope
+    # Scope, alert payloads and timeline in one pass over the rows. Empty
+    # hosts/users/sources are dropped later by _uniq.
     times: List[datetime] = []
     hosts: List[str] = []
     users: List[str] = []
     sources: List[str] = []
     ips: List[str] = []
+    alerts_out: List[Dict[str, Any]] = []
+    # Timeline entries as (time, seq, entry); seq is the row order and keeps
+    # ties in place, as the stable sort this replaces did.
+    alert_entries: List[Tuple[str, int, Dict[str, Any]]] = []
+    event_entries: List[Tuple[str, int, Dict[str, Any]]] = []
+
+    # Every timestamp here is a mapped DateTime column, so skip _safe_iso's
+    # type check and call the unbound isoformat directly.
+    iso = datetime.isoformat
+    add_time = times.append
+    add_host = hosts.append
+    add_user = users.append
+    add_source = sources.append
+    add_alert = alerts_out.append
+    add_alert_entry = alert_entries.append
+    add_event_entry = event_entries.append
+
+    for i, r in enumerate(rows):
+        created_at = r.created_at
+        created_iso = iso(created_at)
+        source, host, user, summary = r.source, r.host, r.user, r.summary
+        add_time(created_at)
+        add_host(host)
+        add_user(user)
+        add_source(source)
+        add_alert(
+            {
+                "id": r.id,
+                "created_at": created_iso,
+                "severity": r.severity,
+                "rule_name": r.rule_name,
+                "summary": summary,
+                "event_id": r.event_id,
+                "host": host,
+                "user": user,
+                "source": source,
+            }
+        )
+        # Timeline: alerts plus (if available) raw event ingest records.
+        add_alert_entry(
+            (
+                created_iso,
+                2 * i,
+                {
+                    "time": created_iso,
+                    "type": "alert",
+                    "source": source,
+                    "host": host,
+                    "user": user,
+                    "summary": f"[{r.severity}] {r.rule_name}: {summary}",
+                },
+            )
+        )
 
-    for a in alerts:
-        times.append(a.created_at)
-        if a.host:
-            hosts.append(a.host)
-        if a.user:
-            users.append(a.user)
-        if a.source:
-            sources.append(a.source)
-
-        ev = events_by_id.get(a.event_id)
-        if ev:
-            times.append(ev.received_at)
-            if ev.host:
-                hosts.append(ev.host)
-            if ev.user:
-                users.append(ev.user)
-            if ev.source:
-                sources.append(ev.source)
-            if isinstance(ev.raw, dict):
-                ips.extend(_extract_ips(ev.raw))
+        if r.ev_id is None:
+            continue
+        received_at = r.ev_received_at
+        ev_source, ev_host, ev_user, raw = r.ev_source, r.ev_host, r.ev_user, r.ev_raw
+        add_time(received_at)
+        add_host(ev_host)
+        add_user(ev_user)
+        add_source(ev_source)
+        if isinstance(raw, dict):
+            derived = _event_derived.get(r.ev_id)
+            if derived is None:
+                derived = (_event_summary(raw), tuple(_extract_ips(raw)))
+                _event_derived.put(r.ev_id, derived)
+            ips.extend(derived[1])
+            received_iso = iso(received_at)
+            add_event_entry(
+                (
+                    received_iso,
+                    2 * i + 1,
+                    {
+                        "time": received_iso,
+                        "type": "event",
+                        "source": ev_source,
+                        "host": ev_host,
+                        "user": ev_user,
+                        "summary": derived[0],
+                    },
+                )
+            )
 
     if not times:
         start = inc.created_at
@@ -129,53 +262,18 @@ def build_incident_packet(session: Session, incident_id: str) -> Dict[str, Any]:
         start = min(times)
         end = max(times)
 
-    def _uniq(items: List[str]) -> List[str]:
-        seen = set()
-        out: List[str] = []
-        for x in items:
-            if not x:
-                continue
-            if x in seen:
-                continue
-            seen.add(x)
-            out.append(x)
-        return out
-
     scope = {
-        "time_window": {"start": _safe_iso(start), "end": _safe_iso(end)},
+        "time_window": {"start": iso(start), "end": iso(end)},
         "hosts": _uniq(hosts),
         "users": _uniq(users),
         "sources": _uniq(sources),
         "ips": _uniq(ips),
     }
 
-    # Timeline: alerts plus (if available) raw event ingest records.
-    timeline: List[Dict[str, Any]] = []
-    for a in alerts:
-        timeline.append(
-            {
-                "time": _safe_iso(a.created_at),
-                "type": "alert",
-                "source": a.source,
-                "host": a.host,
-                "user": a.user,
-                "summary": f"[{a.severity}] {a.rule_name}: {a.summary}",
-            }
-        )
-        ev = events_by_id.get(a.event_id)
-        if ev and isinstance(ev.raw, dict):
-            timeline.append(
-                {
-                    "time": _safe_iso(ev.received_at),
-                    "type": "event",
-                    "source": ev.source,
-                    "host": ev.host,
-                    "user": ev.user,
-                    "summary": _event_summary(ev.raw),
-                }
-            )
-
-    timeline.sort(key=lambda t: t["time"])
+    # Alert entries already follow the created_at ORDER BY; only the events
+    # need ordering before a linear merge.
+    event_entries.sort()
+    timeline = [entry for _, _, entry in heapq.merge(alert_entries, event_entries)]
 
     packet = {
         "incident": {
@@ -183,31 +281,18 @@ def build_incident_packet(session: Session, incident_id: str) -> Dict[str, Any]:
             "title": inc.title,
             "severity": inc.severity,
             "status": inc.status,
-            "created_at": _safe_iso(inc.created_at),
-            "updated_at": _safe_iso(inc.updated_at),
+            "created_at": iso(inc.created_at),
+            "updated_at": iso(inc.updated_at),
             "description": inc.description,
         },
         "scope": scope,
-        "alerts": [
-            {
-                "id": a.id,
-                "created_at": _safe_iso(a.created_at),
-                "severity": a.severity,
-                "rule_name": a.rule_name,
-                "summary": a.summary,
-                "event_id": a.event_id,
-                "host": a.host,
-                "user": a.user,
-                "source": a.source,
-            }
-            for a in alerts
-        ],
+        "alerts": alerts_out,
         "timeline": timeline,
         "actions": [
             {
                 "id": act.id,
                 "incident_id": act.incident_id,
-                "created_at": _safe_iso(act.created_at),
+                "created_at": iso(act.created_at),
                 "actor": act.actor,
                 "action_type": act.action_type,
                 "summary": act.summary,
@@ -220,27 +305,75 @@ def build_incident_packet(session: Session, incident_id: str) -> Dict[str, Any]:
     return packet
 
 
-def write_packet_evidence(session: Session, incident_id: str, packet: Dict[str, Any]) -> List[EvidenceFile]:
+def _file_matches(path: Path, size: int, sha: str) -> bool:
+    # A size check first keeps the common "packet changed" case from reading.
+    # The hash is streamed so the old file is never held in memory.
+    try:
+        if path.stat().st_size != size:
+            return False
+        with path.open("rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest() == sha
+    except FileNotFoundError:
+        return False
+
+
+def _atomic_write(path: Path, payload: bytes) -> None:
+    # Readers see either the old file or the new one, never a partial write.
+    tmp = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def write_packet_evidence(
+    session: Session, incident_id: str, packet: Dict[str, Any], limit: Optional[int] = None
+) -> List[EvidenceFile]:
+    """
+    Writes the packet as evidence and returns the incident's evidence list,
+    newest first. `limit` caps the list in SQL for callers that only show
+    the most recent files.
+    """
     incident_dir = EVIDENCE_DIR / incident_id
     incident_dir.mkdir(parents=True, exist_ok=True)
 
     filename_rel = f"{incident_id}/incident-packet.json"
     file_path = incident_dir / "incident-packet.json"
 
-    payload = json.dumps(packet, indent=2, ensure_ascii=False, default=str).encode("utf-8")
+    payload = _dumps(packet)
     sha = hashlib.sha256(payload).hexdigest()
     size = len(payload)
 
-    file_path.write_bytes(payload)
+    if not _file_matches(file_path, size, sha):
+        _atomic_write(file_path, payload)
 
-    existing = session.exec(
+    # The caller needs the list anyway, so check for a duplicate in it
+    # rather than probing separately, and add the new row in place.
+    stmt = (
         select(EvidenceFile)
         .where(EvidenceFile.incident_id == incident_id)
-        .where(EvidenceFile.filename == filename_rel)
-        .where(EvidenceFile.sha256 == sha)
-    ).first()
+        .order_by(EvidenceFile.created_at.desc())
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    evidence = list(session.exec(stmt).all())
+
+    stored = any(e.sha256 == sha and e.filename == filename_rel for e in evidence)
+    if not stored and limit is not None and len(evidence) >= limit:
+        # The list was cut short, so an older copy may sit past the cap.
+        stored = (
+            session.exec(
+                select(EvidenceFile.id)
+                .where(EvidenceFile.incident_id == incident_id)
+                .where(EvidenceFile.filename == filename_rel)
+                .where(EvidenceFile.sha256 == sha)
+            ).first()
+            is not None
+        )
 
-    if not existing:
+    if not stored:
         ef = EvidenceFile(
             incident_id=incident_id,
             filename=filename_rel,
@@ -250,100 +383,136 @@ def write_packet_evidence(session: Session, incident_id: str, packet: Dict[str,
         )
         session.add(ef)
         session.commit()
+        evidence.insert(0, ef)
+        if limit is not None:
+            del evidence[limit:]
 
-    # Return latest evidence list
-    return session.exec(
-        select(EvidenceFile)
-        .where(EvidenceFile.incident_id == incident_id)
-        .order_by(EvidenceFile.created_at.desc())
-    ).all()
+    return evidence
+
+
+# Most evidence files listed in a PDF report.
+PDF_MAX_EVIDENCE = 200
+
+# Per-row report templates, filled with a single %-format per line.
+_MD_ACTION_FMT = "- **%s** [%s] (%s) %s\n"
+_MD_TIMELINE_FMT = "- **%s** %s src=%s host=%s user=%s , %s\n"
+_PDF_ACTION_FMT = "%s  [%s]  (%s)  %s"
+_PDF_TIMELINE_FMT = "%s  %s  src=%s  host=%s  user=%s , %s"
 
 
 def render_markdown(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> str:
+    # Renderers take packets from build_incident_packet, which fills every
+    # key, so fields are subscripted directly.
     inc = packet["incident"]
     scope = packet["scope"]
-    actions = packet.get("actions", [])
-    timeline = packet.get("timeline", [])
-
-    lines: List[str] = []
-    lines.append(f"# Incident Report: {inc['title']}")
-    lines.append("")
-    lines.append(f"- **Incident ID:** {inc['id']}")
-    lines.append(f"- **Status:** {inc['status']}")
-    lines.append(f"- **Severity:** {inc['severity']}")
-    lines.append(f"- **Created:** {inc['created_at']}")
-    lines.append(f"- **Updated:** {inc['updated_at']}")
-    if inc.get("description"):
-        lines.append(f"- **Description:** {inc['description']}")
-    lines.append("")
-
-    lines.append("## Scope")
-    lines.append(f"- **Window:** {scope['time_window']['start']} to {scope['time_window']['end']}")
-    lines.append(f"- **Hosts:** {', '.join(scope['hosts']) if scope['hosts'] else 'none'}")
-    lines.append(f"- **Users:** {', '.join(scope['users']) if scope['users'] else 'none'}")
-    lines.append(f"- **Sources:** {', '.join(scope['sources']) if scope['sources'] else 'none'}")
-    lines.append(f"- **IPs:** {', '.join(scope['ips']) if scope['ips'] else 'none'}")
-    lines.append("")
-
-    lines.append("## Actions (Investigation Log)")
+    actions = packet["actions"]
+    timeline = packet["timeline"]
+
+    buf = StringIO()
+    w = buf.write
+    w(f"# Incident Report: {inc['title']}\n")
+    w("\n")
+    w(f"- **Incident ID:** {inc['id']}\n")
+    w(f"- **Status:** {inc['status']}\n")
+    w(f"- **Severity:** {inc['severity']}\n")
+    w(f"- **Created:** {inc['created_at']}\n")
+    w(f"- **Updated:** {inc['updated_at']}\n")
+    if inc["description"]:
+        w(f"- **Description:** {inc['description']}\n")
+    w("\n")
+
+    w("## Scope\n")
+    w(f"- **Window:** {scope['time_window']['start']} to {scope['time_window']['end']}\n")
+    w(f"- **Hosts:** {', '.join(scope['hosts']) if scope['hosts'] else 'none'}\n")
+    w(f"- **Users:** {', '.join(scope['users']) if scope['users'] else 'none'}\n")
+    w(f"- **Sources:** {', '.join(scope['sources']) if scope['sources'] else 'none'}\n")
+    w(f"- **IPs:** {', '.join(scope['ips']) if scope['ips'] else 'none'}\n")
+    w("\n")
+
+    w("## Actions (Investigation Log)\n")
     if not actions:
-        lines.append("_No actions recorded._")
+        w("_No actions recorded._\n")
     else:
         for a in actions:
-            actor = a.get("actor") or "unknown"
-            atype = a.get("action_type") or "note"
-            ts = a.get("created_at")
-            summary = a.get("summary") or ""
-            lines.append(f"- **{ts}** [{atype}] ({actor}) {summary}")
-            details = a.get("details")
+            actor = a["actor"] or "unknown"
+            atype = a["action_type"] or "note"
+            ts = a["created_at"]
+            summary = a["summary"] or ""
+            w(_MD_ACTION_FMT % (ts, atype, actor, summary))
+            details = a["details"]
             if isinstance(details, dict) and details:
-                try:
-                    detail_json = json.dumps(details, indent=2, ensure_ascii=False)
-                except Exception:
-                    # Fall back to a JSON string that serializes non-standard types using str()
-                    detail_json = json.dumps(details, indent=2, ensure_ascii=False, default=str)
-                lines.append("")
-                lines.append("```json")
-                lines.append(detail_json)
-                lines.append("```")
-                lines.append("")
-    lines.append("")
-
-    lines.append("## Timeline")
+                # Non-standard types serialize using str()
+                detail_json = _dumps(details, pretty=True).decode("utf-8")
+                w("\n```json\n")
+                w(detail_json)
+                w("\n```\n\n")
+    w("\n")
+
+    w("## Timeline\n")
     if not timeline:
-        lines.append("_No timeline entries._")
+        w("_No timeline entries._\n")
     else:
         for t in timeline[:500]:
-            ts = t.get("time")
-            typ = (t.get("type") or "").upper()
-            src = t.get("source") or "n/a"
-            host = t.get("host") or "n/a"
-            user = t.get("user") or "n/a"
-            summary = t.get("summary") or ""
-            lines.append(f"- **{ts}** {typ} src={src} host={host} user={user} , {summary}")
-    lines.append("")
-
-    lines.append("## Evidence")
+            ts = t["time"]
+            typ = (t["type"] or "").upper()
+            src = t["source"] or "n/a"
+            host = t["host"] or "n/a"
+            user = t["user"] or "n/a"
+            summary = t["summary"] or ""
+            w(_MD_TIMELINE_FMT % (ts, typ, src, host, user, summary))
+    w("\n")
+
+    w("## Evidence\n")
     if not evidence:
-        lines.append("_No evidence files recorded._")
+        w("_No evidence files recorded._\n")
     else:
         for e in evidence:
-            lines.append(f"- {e.filename} (sha256={e.sha256}, size={e.size_bytes} bytes, created={e.created_at})")
+            w(f"- {e.filename} (sha256={e.sha256}, size={e.size_bytes} bytes, created={e.created_at})\n")
+
+    return buf.getvalue()
+
 
-    lines.append("")
-    return "\n".join(lines)
+# ReportLab styles are built once and shared by every render; treat them as
+# read-only.
+_STYLES = getSampleStyleSheet()
+_TABLE_CMDS = [
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+]
+_TABLE_STYLE = TableStyle(_TABLE_CMDS)
+_META_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+    ]
+    + _TABLE_CMDS
+)
 
 
-def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
+def render_pdf(
+    packet: Dict[str, Any], evidence: List[EvidenceFile], out: Optional[BinaryIO] = None
+) -> Optional[bytes]:
+    """
+    Renders the report PDF. With `out`, pages are written straight into that
+    binary file object and nothing is returned; otherwise the PDF bytes are.
+    """
     inc = packet["incident"]
     scope = packet["scope"]
-    actions = packet.get("actions", [])
-    timeline = packet.get("timeline", [])
+    actions = packet["actions"]
+    timeline = packet["timeline"]
 
-    buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=LETTER, title=f"Incident Report - {inc['title']}")
-    styles = getSampleStyleSheet()
+    buf = BytesIO() if out is None else None
+    doc = SimpleDocTemplate(out if out is not None else buf, pagesize=LETTER, title=f"Incident Report - {inc['title']}")
+    styles = _STYLES
     story: List[Any] = []
+    # Locals for the per-row loops below.
+    add = story.append
+    para = Paragraph
+    body = styles["BodyText"]
 
     story.append(Paragraph(f"Incident Report: {inc['title']}", styles["Title"]))
     story.append(Spacer(1, 10))
@@ -355,24 +524,11 @@ def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
         ["Created", inc["created_at"]],
         ["Updated", inc["updated_at"]],
     ]
-    if inc.get("description"):
+    if inc["description"]:
         meta_data.append(["Description", inc["description"]])
 
     t = Table(meta_data, colWidths=[120, 420])
-    t.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
-                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                ("GRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-                ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ]
-        )
-    )
+    t.setStyle(_META_TABLE_STYLE)
     story.append(t)
     story.append(Spacer(1, 12))
 
@@ -388,18 +544,7 @@ def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
         ],
         colWidths=[120, 420],
     )
-    scope_tbl.setStyle(
-        TableStyle(
-            [
-                ("GRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-                ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ]
-        )
-    )
+    scope_tbl.setStyle(_TABLE_STYLE)
     story.append(scope_tbl)
     story.append(Spacer(1, 12))
 
@@ -409,11 +554,11 @@ def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
         story.append(Paragraph("No actions recorded.", styles["BodyText"]))
     else:
         for a in actions[:200]:
-            actor = a.get("actor") or "unknown"
-            atype = a.get("action_type") or "note"
-            ts = a.get("created_at")
-            summary = a.get("summary") or ""
-            story.append(Paragraph(f"{ts}  [{atype}]  ({actor})  {summary}", styles["BodyText"]))
+            actor = a["actor"] or "unknown"
+            atype = a["action_type"] or "note"
+            ts = a["created_at"]
+            summary = a["summary"] or ""
+            add(para(_PDF_ACTION_FMT % (ts, atype, actor, summary), body))
     story.append(Spacer(1, 12))
 
     story.append(Paragraph("Timeline", styles["Heading2"]))
@@ -422,15 +567,13 @@ def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
         story.append(Paragraph("No timeline entries.", styles["BodyText"]))
     else:
         for titem in timeline[:250]:
-            ts = titem.get("time")
-            typ = (titem.get("type") or "").upper()
-            src = titem.get("source") or "n/a"
-            host = titem.get("host") or "n/a"
-            user = titem.get("user") or "n/a"
-            summary = titem.get("summary") or ""
-            story.append(
-                Paragraph(f"{ts}  {typ}  src={src}  host={host}  user={user} , {summary}", styles["BodyText"])
-            )
+            ts = titem["time"]
+            typ = (titem["type"] or "").upper()
+            src = titem["source"] or "n/a"
+            host = titem["host"] or "n/a"
+            user = titem["user"] or "n/a"
+            summary = titem["summary"] or ""
+            add(para(_PDF_TIMELINE_FMT % (ts, typ, src, host, user, summary), body))
     story.append(Spacer(1, 12))
 
     story.append(Paragraph("Evidence", styles["Heading2"]))
@@ -438,13 +581,13 @@ def render_pdf(packet: Dict[str, Any], evidence: List[EvidenceFile]) -> bytes:
     if not evidence:
         story.append(Paragraph("No evidence files recorded.", styles["BodyText"]))
     else:
-        for e in evidence[:200]:
-            story.append(
-                Paragraph(
+        for e in evidence[:PDF_MAX_EVIDENCE]:
+            add(
+                para(
                     f"{e.filename}  sha256={e.sha256}  size={e.size_bytes} bytes  created={_safe_iso(e.created_at)}",
-                    styles["BodyText"],
+                    body,
                 )
             )
 
     doc.build(story)
-    return buf.getvalue()
+    return buf.getvalue() if buf is not None else None
@@ -19,6 +19,14 @@ class ImportJobRead(BaseModel):
     created_at: Optional[datetime] = None
 
 
+class EventListItem(SQLModel):
+    id: UUID
+    received_at: datetime
+    source: str
+    host: Optional[str] = None
+    user: Optional[str] = None
+
+
 class IncidentCreate(SQLModel):
     title: str
     severity: str = "medium"
@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so point the app at a throwaway SQLite
+# database before any test imports it.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["ADMIN_API_KEY"] = "test-key"
+
+
+@pytest.fixture(autouse=True)
+def evidence_dir(tmp_path, monkeypatch):
+    """
+    Keeps evidence written during tests out of the source tree.
+    """
+    from app import main, reporting
+    from app.connectors import aws_cloudtrail
+
+    for module in (main, reporting, aws_cloudtrail):
+        monkeypatch.setattr(module, "EVIDENCE_DIR", tmp_path)
+    return tmp_path
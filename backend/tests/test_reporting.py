@@ -0,0 +1,35 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+HEADERS = {"X-API-Key": "test-key"}
+
+# Wider than 64 bits, which orjson refuses to encode.
+BIG_INT = 123456789012345678901234567890
+
+
+def test_reports_render_action_details_with_big_ints(evidence_dir):
+    with TestClient(app) as client:
+        r = client.post("/incidents", json={"title": "big int", "alert_ids": []}, headers=HEADERS)
+        assert r.status_code == 200, r.text
+        incident_id = r.json()["id"]
+
+        r = client.post(
+            f"/incidents/{incident_id}/actions",
+            json={"summary": "noted", "details": {"aws_account_ref": BIG_INT}},
+            headers=HEADERS,
+        )
+        assert r.status_code == 200, r.text
+
+        md = client.get(f"/incidents/{incident_id}/report/markdown", headers=HEADERS)
+        assert md.status_code == 200, md.text
+        assert f'"aws_account_ref": {BIG_INT}' in md.text
+
+        pdf = client.get(f"/incidents/{incident_id}/report/pdf", headers=HEADERS)
+        assert pdf.status_code == 200, pdf.text
+        assert pdf.content[:4] == b"%PDF"
+
+    packet = json.loads((evidence_dir / incident_id / "incident-packet.json").read_bytes())
+    assert packet["actions"][0]["details"]["aws_account_ref"] == BIG_INT